@@ -6,8 +6,10 @@
 """
 
 import os
+import functools
 from pathlib import Path
 
+@functools.lru_cache(maxsize=None)
 def load_env():
     """加载 .env 文件"""
     env_path = Path(__file__).parent / '.env'
@@ -30,13 +32,15 @@ def load_env():
     
     return env_vars
 
+@functools.lru_cache(maxsize=None)
 def get_config():
-    """获取配置"""
+    """获取配置（进程内只解析一次 .env）"""
     env = load_env()
     
     diary_base_path = env.get('DIARY_BASE_PATH')
     database_path = env.get('DATABASE_PATH')
     lm_studio_url = env.get('LM_STUDIO_URL', 'http://127.0.0.1:1234/v1/chat/completions')
+    lm_studio_model = env.get('LM_STUDIO_MODEL', '')
     
     if not diary_base_path:
         raise ValueError("DIARY_BASE_PATH 未在 .env 中配置")
@@ -52,5 +56,6 @@ def get_config():
     return {
         'diary_base_path': diary_base_path,
         'database_path': database_path,
-        'lm_studio_url': lm_studio_url
+        'lm_studio_url': lm_studio_url,
+        'lm_studio_model': lm_studio_model
     }
@@ -8,6 +8,7 @@ CREATE TABLE diary_entries (
     month INTEGER NOT NULL,                       -- 月份 (便于查询)
     day INTEGER NOT NULL,                         -- 日期 (便于查询)
     content TEXT NOT NULL,                        -- 日记内容
+    summary TEXT,                                 -- AI 生成的摘要
     file_source TEXT,                             -- 源文件路径
     entry_type TEXT CHECK(entry_type IN ('single_day', 'multi_day', 'retrospective', 'summary', 'stock_diary', 'note')), -- 文件类型
     word_count INTEGER DEFAULT 0,                 -- 字数统计
@@ -23,8 +24,7 @@ CREATE INDEX idx_diary_year_month ON diary_entries(year, month);
 CREATE INDEX idx_diary_type ON diary_entries(entry_type);
 CREATE INDEX idx_diary_word_count ON diary_entries(word_count);
 
--- 创建全文搜索索引（用于内容搜索）
-CREATE VIRTUAL TABLE diary_fts USING fts5(date, content, file_source);
+-- 全文搜索索引见 create_diary_fts.sql
 
 -- 统计表（可选，用于快速查询统计信息）
 CREATE TABLE diary_stats (
@@ -0,0 +1,33 @@
+-- 全文搜索索引（用于内容搜索）
+-- trigram 分词：任意 3 字子串均可 MATCH，中文无需预先分词（需 SQLite 3.34+）
+-- 不足 3 字的词在 diary_fts 上 MATCH/LIKE/GLOB 均无结果（不报错），两字词需查 diary_entries.content LIKE '%词%'
+-- 外部内容表：内容取自 diary_entries，rowid 即 diary_entries.id，可按整数主键关联
+-- 摘要与原文同时索引，排序建议 bm25(diary_fts, 5.0, 1.0)：摘要命中权重高于原文
+-- 可重复执行：每次按当前定义重建，已有数据需另行回填（INSERT INTO diary_fts(diary_fts) VALUES('rebuild')）
+
+DROP TRIGGER IF EXISTS diary_entries_ai;
+DROP TRIGGER IF EXISTS diary_entries_ad;
+DROP TRIGGER IF EXISTS diary_entries_au;
+DROP TABLE IF EXISTS diary_fts;
+
+CREATE VIRTUAL TABLE diary_fts USING fts5(
+    summary,
+    content,
+    content='diary_entries',
+    content_rowid='id',
+    tokenize='trigram'
+);
+
+-- 触发器：diary_entries 增删改时同步索引
+CREATE TRIGGER diary_entries_ai AFTER INSERT ON diary_entries BEGIN
+    INSERT INTO diary_fts (rowid, summary, content) VALUES (new.id, new.summary, new.content);
+END;
+
+CREATE TRIGGER diary_entries_ad AFTER DELETE ON diary_entries BEGIN
+    INSERT INTO diary_fts (diary_fts, rowid, summary, content) VALUES ('delete', old.id, old.summary, old.content);
+END;
+
+CREATE TRIGGER diary_entries_au AFTER UPDATE OF summary, content ON diary_entries BEGIN
+    INSERT INTO diary_fts (diary_fts, rowid, summary, content) VALUES ('delete', old.id, old.summary, old.content);
+    INSERT INTO diary_fts (rowid, summary, content) VALUES (new.id, new.summary, new.content);
+END;
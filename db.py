@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据库连接模块
+统一打开 SQLite 连接并设置 PRAGMA
+"""
+
+import sqlite3
+
+# WAL 减少提交时的 fsync；较大的页缓存与 mmap 让 FTS 索引在多次查询间常驻内存
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -65536",       # 64MB
+    "PRAGMA mmap_size = 268435456",     # 256MB
+    "PRAGMA temp_store = MEMORY",
+)
+
+
+def open_db(db_path, **kwargs):
+    """打开数据库连接并应用 PRAGMA，其余参数透传给 sqlite3.connect"""
+    conn = sqlite3.connect(db_path, **kwargs)
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def ensure_summary_column(conn):
+    """旧库补齐 diary_entries.summary 列（全文索引与摘要生成均依赖该列）"""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(diary_entries)")}
+    if 'summary' not in columns:
+        conn.execute("ALTER TABLE diary_entries ADD COLUMN summary TEXT")
+        conn.commit()
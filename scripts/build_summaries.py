@@ -6,40 +6,110 @@
 支持断点续跑、抽样测试模式
 """
 
-import sqlite3
 import sys
-import io
 import json
 import time
+import hashlib
 import argparse
+import functools
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-from urllib.request import Request, urlopen
-from urllib.error import URLError
+from http.client import HTTPConnection, HTTPSConnection, HTTPException
+from urllib.parse import urlsplit
 
 # 确保可导入项目根目录模块（如 config.py）
 ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+from config import get_config
+from db import open_db, ensure_summary_column
+
 # Windows 控制台编码修复
 if sys.platform == 'win32':
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
-
-# LM Studio 配置
-LM_STUDIO_URL = "http://127.0.0.1:1234/v1/chat/completions"
-
-# 数据库路径将从配置加载
-DB_PATH = None
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+
+def get_config_value(key):
+    """读取配置项（database_path / lm_studio_url），get_config 已缓存"""
+    return get_config()[key]
+
+# 与 LM Studio 的 HTTP 长连接，每个线程各持一条，懒加载后复用，省去每次调用的 TCP 握手
+_llm_local = threading.local()
+
+# 全量模式同时在途的摘要请求数（LM Studio 会排队/并行处理）
+LLM_WORKERS = 4
+
+# 全量模式每累计多少条摘要批量写回一次
+SUMMARY_BATCH_SIZE = 50
+
+
+def get_llm_connection():
+    """获取（必要时新建）当前线程与 LM Studio 的长连接"""
+    http = getattr(_llm_local, 'conn', None)
+    if http is None:
+        url = urlsplit(get_config_value('lm_studio_url'))
+        conn_cls = HTTPSConnection if url.scheme == 'https' else HTTPConnection
+        http = _llm_local.conn = conn_cls(url.netloc, timeout=60)
+    return http
+
+
+def close_llm_connection():
+    """关闭当前线程的长连接，下次调用时重建"""
+    http = getattr(_llm_local, 'conn', None)
+    if http is not None:
+        http.close()
+        _llm_local.conn = None
+
+
+def llm_http(method, path, payload=None):
+    """向 LM Studio 发送请求并返回 (状态码, 响应体)；服务端已关闭空闲连接时重连一次"""
+    for attempt in range(2):
+        http = get_llm_connection()
+        try:
+            http.request(method, path or '/', body=payload,
+                         headers={"Content-Type": "application/json"})
+            resp = http.getresponse()
+            return resp.status, resp.read()
+        except (ConnectionResetError, BrokenPipeError, HTTPException):
+            close_llm_connection()
+            if attempt:
+                raise
+        except OSError:
+            close_llm_connection()
+            raise
+
+
+def post_llm(payload):
+    """POST 到 LM_STUDIO_URL 并返回 (状态码, 响应体)"""
+    url = urlsplit(get_config_value('lm_studio_url'))
+    return llm_http('POST', url.path + ('?' + url.query if url.query else ''), payload)
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_model():
+    """模型标识：优先 .env 的 LM_STUDIO_MODEL；未配置时查询一次 /v1/models，
+    仅当服务端只列出一个模型时采用其 id。无法确定时返回 None（此时不使用缓存）
+    """
+    model = get_config_value('lm_studio_model')
+    if model:
+        return model
+
+    url = urlsplit(get_config_value('lm_studio_url'))
+    models_path = url.path.rsplit('/chat/completions', 1)[0] + '/models'
+    try:
+        status, body = llm_http('GET', models_path)
+        if status == 200:
+            ids = [m['id'] for m in json.loads(body.decode('utf-8')).get('data', [])]
+            if len(ids) == 1:
+                return ids[0]
+    except (OSError, HTTPException, ValueError, KeyError) as e:
+        print(f"  [错误] 查询模型列表失败: {e}")
+    print("  [提示] 无法确定当前模型，本次不使用摘要缓存（可在 .env 设置 LM_STUDIO_MODEL）")
+    return None
 
-def get_db_path():
-    """获取数据库路径"""
-    global DB_PATH
-    if DB_PATH is None:
-        from config import get_config
-        config = get_config()
-        DB_PATH = config['database_path']
-    return DB_PATH
 
 # 摘要 prompt
 SUMMARY_PROMPT = """你是一个日记摘要助手。请用一句话概括以下日记的核心内容，保留关键人物、地点、事件和情绪。不要添加任何评论或解释，只输出摘要本身。
@@ -60,31 +130,76 @@ NOTE_SUMMARY_PROMPT = """你是一个日记摘要助手。请用2-3句话概括
 摘要："""
 
 
-def call_llm(prompt, max_tokens=200):
-    """调用 LM Studio 的 OpenAI 兼容 API"""
-    payload = json.dumps({
+def build_llm_params(prompt, max_tokens=200):
+    """组装请求参数（不含 stream），同时作为缓存键的来源；模型已知时一并发送"""
+    params = {
         "messages": [{"role": "user", "content": prompt}],
         "max_tokens": max_tokens,
         "temperature": 0.3,
-        "stream": False
-    }).encode('utf-8')
+    }
+    model = get_llm_model()
+    if model:
+        params["model"] = model
+    return params
 
-    req = Request(
-        LM_STUDIO_URL,
-        data=payload,
-        headers={"Content-Type": "application/json"}
-    )
 
-    try:
-        with urlopen(req, timeout=60) as resp:
-            result = json.loads(resp.read().decode('utf-8'))
-            return result['choices'][0]['message']['content'].strip()
-    except URLError as e:
-        print(f"  [错误] LM Studio 连接失败: {e}")
+def llm_cache_key(params):
+    """请求参数（含 model）的 sha256，作为 llm_cache 主键；
+    参数中没有 model 时返回 None：无法区分模型的结果不缓存
+    """
+    if "model" not in params:
         return None
+    return hashlib.sha256(
+        json.dumps(params, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    ).hexdigest()
+
+
+def get_cached_response(conn, key):
+    """查询 llm_cache，未命中返回 None"""
+    row = conn.execute("SELECT response FROM llm_cache WHERE key = ?", (key,)).fetchone()
+    return row[0] if row else None
+
+
+CACHE_INSERT_SQL = "INSERT OR REPLACE INTO llm_cache (key, response, created_at) VALUES (?, ?, ?)"
+
+
+def request_llm(params):
+    """向 LM Studio 发送请求，返回 (文本, 错误信息)，成功时错误信息为 None。
+    不访问数据库也不打印，可在工作线程中调用；错误由主线程统一输出，避免打断进度行
+    """
+    payload = json.dumps({**params, "stream": False}).encode('utf-8')
+
+    try:
+        status, body = post_llm(payload)
+        if status != 200:
+            return None, f"LM Studio 返回 HTTP {status}"
+        result = json.loads(body.decode('utf-8'))
+        return result['choices'][0]['message']['content'].strip(), None
+    except (OSError, HTTPException) as e:
+        return None, f"LM Studio 连接失败: {e}"
     except Exception as e:
-        print(f"  [错误] API 调用出错: {e}")
-        return None
+        return None, f"API 调用出错: {e}"
+
+
+def call_llm(prompt, max_tokens=200):
+    """调用 LM Studio 的 OpenAI 兼容 API（不经缓存，用于连接测试），失败时打印原因并返回 None"""
+    text, error = request_llm(build_llm_params(prompt, max_tokens))
+    if error:
+        print(f"  [错误] {error}")
+    return text
+
+
+def ensure_llm_cache(conn):
+    """创建 LLM 响应缓存表。
+    重新导入会清空 diary_entries（连同摘要），缓存表独立保留，重跑摘要时相同 prompt 直接命中。
+    """
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,          -- sha256(model, messages, max_tokens, temperature)
+            response TEXT NOT NULL,
+            created_at INTEGER
+        )
+    """)
 
 
 def truncate_content(content, max_chars=2000):
@@ -94,23 +209,54 @@ def truncate_content(content, max_chars=2000):
     return content[:1500] + "\n\n...[中间省略]...\n\n" + content[-500:]
 
 
-def generate_summary(date_str, content, entry_type):
-    """为单条日记生成摘要"""
+def build_summary_prompt(date_str, content, entry_type):
+    """按日记类型生成摘要 prompt（content 为已 strip 的原文）"""
+    # 截取超长内容
+    truncated = truncate_content(content)
+
+    # 选择 prompt
+    if entry_type == 'note':
+        return NOTE_SUMMARY_PROMPT.format(date=date_str, content=truncated)
+    return SUMMARY_PROMPT.format(date=date_str, content=truncated)
+
+
+def prepare_summary(conn, entry, use_cache=True):
+    """主线程：极短日记与缓存命中直接得到摘要，返回 (摘要, None, None)；
+    否则返回 (None, 待写入缓存的 key 或 None, 请求参数)
+    """
+    entry_id, date_str, content, entry_type, word_count = entry
     # 极短日记直接用原文
     clean = content.strip()
     if len(clean) < 20:
-        return clean
+        return clean, None, None
 
-    # 截取超长内容
-    truncated = truncate_content(clean)
+    params = build_llm_params(build_summary_prompt(date_str, clean, entry_type))
+    key = llm_cache_key(params)
+    if use_cache and key is not None:
+        cached = get_cached_response(conn, key)
+        if cached:
+            return cached, None, None
+    return None, key, params
 
-    # 选择 prompt
-    if entry_type == 'note':
-        prompt = NOTE_SUMMARY_PROMPT.format(date=date_str, content=truncated)
-    else:
-        prompt = SUMMARY_PROMPT.format(date=date_str, content=truncated)
 
-    return call_llm(prompt)
+def _request_summary(entry, key, params):
+    """工作线程：只做 HTTP 请求，数据库读写全部留在主线程"""
+    return (entry, key) + request_llm(params)
+
+
+def submit_summary(executor, conn, entry, use_cache=True):
+    """主线程：已有摘要时直接返回结果元组，其余交给线程池并返回其 Future。
+    结果均为 (entry, 待写入缓存的 key 或 None, 摘要, 错误信息)，用 summary_result 取出
+    """
+    summary, key, params = prepare_summary(conn, entry, use_cache)
+    if params is None:
+        return entry, None, summary, None
+    return executor.submit(_request_summary, entry, key, params)
+
+
+def summary_result(item):
+    """取出 submit_summary 的结果：Future 等待完成，现成结果原样返回"""
+    return item.result() if isinstance(item, Future) else item
 
 
 def get_sample_entries(conn, count=10):
@@ -150,16 +296,27 @@ def get_all_entries_without_summary(conn):
     return cursor.fetchall()
 
 
-def update_summary(conn, entry_id, summary):
-    """更新单条摘要"""
-    conn.execute(
-        "UPDATE diary_entries SET summary = ? WHERE id = ?",
-        (summary, entry_id)
-    )
-    conn.commit()
-
-
-def run_sample_test():
+def flush_summaries(conn, batch, cache_rows=None):
+    """在一个显式事务内写回摘要（及新产生的 llm_cache 行），然后清空列表。
+    连接为 autocommit 模式（isolation_level=None），事务边界只在这里
+    """
+    if not batch:
+        return
+    conn.execute("BEGIN")
+    try:
+        if cache_rows:
+            conn.executemany(CACHE_INSERT_SQL, cache_rows)
+        conn.executemany("UPDATE diary_entries SET summary = ? WHERE id = ?", batch)
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    batch.clear()
+    if cache_rows:
+        cache_rows.clear()
+
+
+def run_sample_test(use_cache=True):
     """抽样测试模式：随机取几条日记测试摘要质量"""
     print("=" * 60)
     print("[摘要] 抽样测试模式 — 测试摘要生成质量")
@@ -170,33 +327,50 @@ def run_sample_test():
     test = call_llm("请回复'连接成功'", max_tokens=10)
     if test is None:
         print("[错误] 无法连接 LM Studio，请确认已启动并加载模型")
-        print(f"   地址: {LM_STUDIO_URL}")
+        print(f"   地址: {get_config_value('lm_studio_url')}")
         return False
     print(f"[OK] LM Studio 连接成功: {test}")
 
-    conn = sqlite3.connect(get_db_path())
+    conn = open_db(get_config_value('database_path'), isolation_level=None)
+    ensure_summary_column(conn)
+    ensure_llm_cache(conn)
     samples = get_sample_entries(conn, count=10)
 
     print(f"\n抽取 {len(samples)} 条日记进行测试:\n")
 
-    for i, (entry_id, date_str, content, entry_type, word_count) in enumerate(samples, 1):
-        print(f"--- [{i}/{len(samples)}] {date_str} ({entry_type}, {word_count}字) ---")
-        print(f"原文前100字: {content[:100]}...")
+    batch = []
+    cache_rows = []
+    try:
+        for i, entry in enumerate(samples, 1):
+            entry_id, date_str, content, entry_type, word_count = entry
+            print(f"--- [{i}/{len(samples)}] {date_str} ({entry_type}, {word_count}字) ---")
+            print(f"原文前100字: {content[:100]}...")
+
+            start = time.time()
+            summary, key, params = prepare_summary(conn, entry, use_cache)
+            error = None
+            if params is not None:
+                summary, error = request_llm(params)
+            elapsed = time.time() - start
 
-        start = time.time()
-        summary = generate_summary(date_str, content, entry_type)
-        elapsed = time.time() - start
+            if summary:
+                print(f"[摘要] {summary}")
+                print(f"[耗时] {elapsed:.1f}s")
+                if key is not None:
+                    cache_rows.append((key, summary, int(time.time())))
+                batch.append((summary, entry_id))
+            else:
+                print(f"[错误] 摘要生成失败: {error}" if error else "[错误] 摘要生成失败")
+            print()
 
-        if summary:
-            print(f"[摘要] {summary}")
-            print(f"[耗时] {elapsed:.1f}s")
+    except KeyboardInterrupt:
+        print("\n[暂停]  用户中断")
 
-            # 写入数据库
-            update_summary(conn, entry_id, summary)
-            print(f"[OK] 已保存到数据库")
-        else:
-            print(f"[错误] 摘要生成失败")
-        print()
+    finally:
+        # 写入数据库
+        saved = len(batch)
+        flush_summaries(conn, batch, cache_rows)
+        print(f"[OK] 已保存 {saved} 条摘要到数据库")
 
     conn.close()
     print("=" * 60)
@@ -205,7 +379,7 @@ def run_sample_test():
     return True
 
 
-def run_full_build():
+def run_full_build(use_cache=True):
     """全量模式：为所有日记生成摘要"""
     print("=" * 60)
     print("[摘要] 全量摘要生成模式")
@@ -219,7 +393,9 @@ def run_full_build():
         return False
     print(f"[OK] 连接成功")
 
-    conn = sqlite3.connect(get_db_path())
+    conn = open_db(get_config_value('database_path'), isolation_level=None)
+    ensure_summary_column(conn)
+    ensure_llm_cache(conn)
     entries = get_all_entries_without_summary(conn)
     total = len(entries)
 
@@ -234,9 +410,30 @@ def run_full_build():
     success = 0
     failed = 0
     start_time = time.time()
+    batch = []
+    cache_rows = []
+
+    # 按日期顺序提交，最多 LLM_WORKERS * 2 个请求在途；
+    # 按提交顺序取结果，进度输出与单线程时一致，中断时也只需取消少量未开始的请求
+    executor = ThreadPoolExecutor(max_workers=LLM_WORKERS)
+    in_flight = deque()
+    pending = iter(entries)
+    i = 0
 
     try:
-        for i, (entry_id, date_str, content, entry_type, word_count) in enumerate(entries, 1):
+        while True:
+            while len(in_flight) < LLM_WORKERS * 2:
+                entry = next(pending, None)
+                if entry is None:
+                    break
+                in_flight.append(submit_summary(executor, conn, entry, use_cache))
+            if not in_flight:
+                break
+
+            (entry_id, date_str, content, entry_type, word_count), key, summary, error = \
+                summary_result(in_flight.popleft())
+            i += 1
+
             elapsed = time.time() - start_time
             rate = success / elapsed * 3600 if elapsed > 0 and success > 0 else 0
             eta = (total - i) / (success / elapsed) if elapsed > 0 and success > 0 else 0
@@ -245,15 +442,17 @@ def run_full_build():
                   f"| 成功:{success} 失败:{failed} "
                   f"| {rate:.0f}条/h ETA:{eta/60:.0f}min", end="")
 
-            summary = generate_summary(date_str, content, entry_type)
-
             if summary:
-                update_summary(conn, entry_id, summary)
+                if key is not None:
+                    cache_rows.append((key, summary, int(time.time())))
+                batch.append((summary, entry_id))
+                if len(batch) >= SUMMARY_BATCH_SIZE:
+                    flush_summaries(conn, batch, cache_rows)
                 success += 1
                 print(f" [OK] {summary[:40]}...")
             else:
                 failed += 1
-                print(f" [错误]")
+                print(f" [错误] {error}" if error else " [错误]")
 
                 # 连续失败3次就停止
                 if failed >= 3 and success == 0:
@@ -263,6 +462,14 @@ def run_full_build():
     except KeyboardInterrupt:
         print(f"\n\n[暂停]  用户中断。已完成 {success}/{total} 条。下次运行自动续跑。")
 
+    finally:
+        # 取消尚未开始的请求，等待进行中的请求结束，再写回已完成的摘要
+        for item in in_flight:
+            if isinstance(item, Future):
+                item.cancel()
+        executor.shutdown(wait=True)
+        flush_summaries(conn, batch, cache_rows)
+
     conn.close()
 
     total_time = time.time() - start_time
@@ -275,12 +482,15 @@ def main():
     parser = argparse.ArgumentParser(description='日记摘要生成工具')
     parser.add_argument('--all', action='store_true', help='全量生成模式')
     parser.add_argument('--test', action='store_true', help='抽样测试模式（默认）')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='不读取 llm_cache，全部重新请求（新结果仍写入缓存）')
     args = parser.parse_args()
 
+    use_cache = not args.no_cache
     if args.all:
-        run_full_build()
+        run_full_build(use_cache)
     else:
-        run_sample_test()
+        run_sample_test(use_cache)
 
 
 if __name__ == "__main__":
@@ -9,25 +9,66 @@ import os
 import re
 import sqlite3
 import sys
-import io
 from datetime import datetime, date
 from pathlib import Path
 import logging
+from concurrent.futures import ProcessPoolExecutor
 
 # 确保可导入项目根目录模块（如 config.py）
 ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+from config import get_config
+from db import open_db, ensure_summary_column
+
 # Windows 控制台编码修复
 if sys.platform == 'win32':
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 预编译正则，避免逐行/逐文件重复编译
+# 文件名日期：MM_DD.txt、"MM_DD 后缀.txt"、"MM_DD_后缀.txt"
+_RE_MMDD_TXT = re.compile(r'^(\d{1,2})_(\d{1,2})\.txt$')
+_RE_MMDD_SPACE = re.compile(r'^(\d{1,2})_(\d{1,2})\s')
+_RE_MMDD_UNDER = re.compile(r'^(\d{1,2})_(\d{1,2})_')
+_RE_FILENAME_DATES = (_RE_MMDD_TXT, _RE_MMDD_SPACE, _RE_MMDD_UNDER)
+# 内容中的日期标记行（整行，允许首尾空白）：0101、01_01、1月1日、01/01
+_RE_DATE_HEADER = re.compile(
+    r'(?m)^[^\S\n]*(?:'
+    r'(\d{2})(\d{2})'
+    r'|(\d{1,2})_(\d{1,2})'
+    r'|(\d{1,2})月(\d{1,2})日'
+    r'|(\d{1,2})/(\d{1,2})'
+    r')[^\S\n]*$'
+)
+# 只导入这些扩展名的文件
+_DIARY_SUFFIXES = frozenset({'.txt', '.md'})
+
+# 文件名中含图片/表格等扩展名的一律跳过（如 'xxx.jpg.txt'），一次 C 层扫描，无需先转小写
+_RE_SKIP_MARKERS = re.compile(r'\.(?:jpg|png|xlsx|rtf)', re.IGNORECASE)
+
+# 文件名含这些关键词的归为笔记（区分大小写）
+NOTE_KEYWORDS = ('线下活动', '漫展', '名单', '感想', '规划', '目标',
+                 '总结', '经验', '简史', '复诊', '帖子', '三角',
+                 '叫魂', 'record')
+
+# 关键词合成一个交替正则，每个文件名只扫描一遍
+_RE_NOTE_KW = re.compile('|'.join(map(re.escape, NOTE_KEYWORDS)))
+# 学期总结类文件名（不区分大小写，'vaction' 为原文件名中的拼写）
+_RE_SUMMARY_KW = re.compile('semester|term|vaction', re.IGNORECASE)
+
+# 解析进程数上限：解析只占导入耗时的一小部分，再多进程只会增加启动与回传正文的开销
+MAX_PARSE_WORKERS = 4
+# 文件数低于该值时不启用进程池，直接在主进程顺序解析
+PARALLEL_MIN_JOBS = 500
+
+# 同日同类型条目合并时的分隔符
+MERGE_SEPARATOR = "\n\n---[同日补充]---\n\n"
 
 
 class DiaryImporter:
@@ -35,30 +76,58 @@ class DiaryImporter:
         self.diary_root = Path(diary_root_path)
         self.db_path = db_path
         self.conn = None
-        self.year_folders = [f"{year}" for year in range(2004, 2027)]
+        # diary_entries_ai 触发器的建表语句，批量导入期间暂时删除（见 connect_db）
+        self.fts_insert_trigger = None
+        # 年份文件夹：(目录名, 年份, 1月1日, 12月31日)，兜底日期每年只构造一次
+        self.year_plan = [
+            (str(y), y, date(y, 1, 1), date(y, 12, 31)) for y in range(2004, 2027)
+        ]
+        # 标题行正则按年份预编译，如 '2025 生活日记' '2024 炒股日记'
+        self._title_res = {
+            y: re.compile(rf'^{y}\s*(?:生活日记|炒股日记|日记)') for _, y, _, _ in self.year_plan
+        }
         self.excluded_items = {
             'anime_record', 'etc', 'fap', 'merged_diaries', 'database_tools',
             '.gitignore', 'README.md', '.git'
         }
         # 收集所有条目，用于同日合并
-        self.all_entries = {}  # key: date_str -> list of entries
+        # key: (date.toordinal(), entry_type) -> {'date', 'entry_type', 'parts': [正文], 'sources': [来源]}
+        self.all_entries = {}
         # 警告收集
         self.warnings = []
 
     def connect_db(self):
         """连接数据库并创建表"""
+        if sqlite3.sqlite_version_info < (3, 34, 0):
+            logger.error(f"SQLite 版本过低 ({sqlite3.sqlite_version})，trigram 全文索引需要 3.34+")
+            return False
         try:
-            self.conn = sqlite3.connect(self.db_path)
+            # 自动提交模式，事务边界显式控制（BEGIN 见下方，COMMIT 在 run_import）
+            self.conn = open_db(self.db_path, isolation_level=None)
             self.conn.execute("PRAGMA foreign_keys = ON")
-            try:
-                self.conn.execute("DELETE FROM diary_entries")
-                self.conn.execute("DELETE FROM diary_fts")
-                self.conn.execute("DELETE FROM diary_stats")
-                logger.info("清空现有数据")
-            except:
+            exists = self.conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'diary_entries'"
+            ).fetchone()
+            if not exists:
                 with open(ROOT_DIR / "create_diary_db.sql", 'r', encoding='utf-8') as f:
                     self.conn.executescript(f.read())
                 logger.info("创建新表")
+            else:
+                ensure_summary_column(self.conn)
+            # 先清空旧数据，再按当前定义重建全文索引（旧库随之迁移）
+            # 旧索引随后整体丢弃，清空前先摘掉删除触发器，免得逐行同步
+            # 与后续导入处于同一事务，失败可整体回滚
+            with open(ROOT_DIR / "create_diary_fts.sql", 'r', encoding='utf-8') as f:
+                self.conn.executescript(
+                    "BEGIN;\nDROP TRIGGER IF EXISTS diary_entries_ad;\n"
+                    "DELETE FROM diary_entries;\nDELETE FROM diary_stats;\n" + f.read()
+                )
+            # 批量插入期间摘掉插入触发器，导入结束后一次性 rebuild 索引再恢复（见 run_import）
+            self.fts_insert_trigger = self.conn.execute(
+                "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = 'diary_entries_ai'"
+            ).fetchone()[0]
+            self.conn.execute("DROP TRIGGER diary_entries_ai")
+            logger.info("清空现有数据")
             return True
         except Exception as e:
             logger.error(f"数据库连接失败: {e}")
@@ -69,159 +138,98 @@ class DiaryImporter:
             self.conn.close()
 
     def get_word_count(self, text):
-        text = re.sub(r'\s+', '', text)
-        return len(text)
+        # str.split() 去掉的空白与正则 \s 相同；translate 对中文逐字查字典反而更慢
+        return len(''.join(text.split()))
 
     def parse_date_from_filename(self, filename, year):
         """从文件名解析日期，支持 MM_DD.txt 和 MM_DD 开头的变体"""
-        # 精确匹配 MM_DD.txt
-        match = re.match(r'^(\d{1,2})_(\d{1,2})\.txt$', filename)
-        if match:
-            month, day = int(match.group(1)), int(match.group(2))
-            if 1 <= month <= 12 and 1 <= day <= 31:
-                try:
-                    return date(int(year), month, day)
-                except ValueError:
-                    pass
-        # 匹配 MM_DD 开头带中文后缀的文件名，如 "04_01 封城日记.txt"
-        match = re.match(r'^(\d{1,2})_(\d{1,2})\s', filename)
-        if match:
-            month, day = int(match.group(1)), int(match.group(2))
-            if 1 <= month <= 12 and 1 <= day <= 31:
-                try:
-                    return date(int(year), month, day)
-                except ValueError:
-                    pass
-        # 匹配 MM_DD_ 开头，如 "09_01_马来西亚日记 v1.txt"
-        match = re.match(r'^(\d{1,2})_(\d{1,2})_', filename)
-        if match:
-            month, day = int(match.group(1)), int(match.group(2))
-            if 1 <= month <= 12 and 1 <= day <= 31:
-                try:
-                    return date(int(year), month, day)
-                except ValueError:
-                    pass
+        # 依次尝试 MM_DD.txt、"04_01 封城日记.txt"、"09_01_马来西亚日记 v1.txt"
+        for pattern in _RE_FILENAME_DATES:
+            match = pattern.match(filename)
+            if match:
+                month, day = int(match.group(1)), int(match.group(2))
+                if 1 <= month <= 12 and 1 <= day <= 31:
+                    try:
+                        return date(year, month, day)
+                    except ValueError:
+                        pass
         return None
 
     def is_title_line(self, line, year):
         """判断是否为标题行，如 '2025 生活日记' '2024 炒股日记'"""
-        patterns = [
-            rf'^{year}\s*生活日记',
-            rf'^{year}\s*炒股日记',
-            rf'^{year}\s*日记',
-        ]
-        for p in patterns:
-            if re.match(p, line.strip()):
-                return True
-        return False
+        return self._title_res[year].match(line.strip()) is not None
 
-    def parse_date_marker(self, line, year):
+    def parse_date_marker(self, match, year):
         """
-        解析内容中的日期标记行。
+        将 _RE_DATE_HEADER 的匹配结果转换为日期。
         支持格式：0101, 01_01, 1月1日, 01/01
-        返回 date 对象或 None
+        返回 date 对象或 None（月日越界视为普通正文）
         """
-        line = line.strip()
-        if not line:
+        # 命中分支的最后两个分组即 月、日
+        month, day = int(match.group(match.lastindex - 1)), int(match.group(match.lastindex))
+        # 月份范围校验
+        if not (1 <= month <= 12 and 1 <= day <= 31):
+            return None
+        try:
+            return date(year, month, day)
+        except ValueError:
             return None
 
-        patterns = [
-            (r'^(\d{2})(\d{2})$', None),        # 0401
-            (r'^(\d{1,2})_(\d{1,2})$', None),   # 01_01
-            (r'^(\d{1,2})月(\d{1,2})日$', None), # 1月1日
-            (r'^(\d{1,2})/(\d{1,2})$', None),   # 01/01
-        ]
+    def scan_date_headers(self, content, year):
+        """一次扫描找出全部有效日期标记，返回 [(date, 标记行起点, 标记行终点)]"""
+        headers = []
+        for match in _RE_DATE_HEADER.finditer(content):
+            entry_date = self.parse_date_marker(match, year)
+            if entry_date:
+                headers.append((entry_date, match.start(), match.end()))
+        return headers
 
-        for pattern, _ in patterns:
-            match = re.match(pattern, line)
-            if match:
-                month, day = int(match.group(1)), int(match.group(2))
-                # 月份范围校验
-                if not (1 <= month <= 12 and 1 <= day <= 31):
-                    return None
-                try:
-                    return date(int(year), month, day)
-                except ValueError:
-                    return None
-        return None
+    def clean_entry_body(self, body, year):
+        """整理条目正文：去掉标题行与行尾空白，首尾空行"""
+        lines = [line.rstrip() for line in body.split('\n') if not self.is_title_line(line, year)]
+        return '\n'.join(lines).strip()
 
-    def count_date_markers(self, content, year):
-        """统计内容中有多少个有效日期标记"""
-        count = 0
-        for line in content.split('\n'):
-            line = line.strip()
-            if line and self.parse_date_marker(line, year):
-                count += 1
-        return count
-
-    def split_multi_day_content(self, content, year, file_source=""):
-        """分割多日合一文件的内容，带笔误检测"""
-        entries = []
-        lines = content.split('\n')
-        current_entry = {'date': None, 'content': []}
-        prev_month = None
+    def split_multi_day_content(self, content, year, file_source="", headers=None):
+        """分割多日合一文件的内容，带笔误检测；headers 为 scan_date_headers 的结果，可复用"""
+        if headers is None:
+            headers = self.scan_date_headers(content, year)
 
-        for line in lines:
-            stripped = line.strip()
-            if not stripped:
-                # 保留空行在内容中（段落分隔）
-                if current_entry['date'] and current_entry['content']:
-                    current_entry['content'].append('')
-                continue
+        # 两个标记之间的文本即前一条目的正文
+        spans = []  # (date, 正文起点, 正文终点)
+        prev_month = None
 
-            # 跳过标题行
-            if self.is_title_line(stripped, year):
-                continue
+        for entry_date, header_start, header_end in headers:
+            if spans:
+                spans[-1][2] = header_start
 
-            # 检查是否是日期行
-            entry_date = self.parse_date_marker(stripped, year)
-            if entry_date:
-                # 保存之前的条目
-                if current_entry['date'] and current_entry['content']:
-                    entries.append(current_entry)
-
-                # 笔误检测：检查月份跳跃
-                if prev_month is not None and entry_date.month != prev_month:
-                    # 允许相邻月份（如1月文件包含到2月初）
-                    if abs(entry_date.month - prev_month) > 2 and not (prev_month == 12 and entry_date.month <= 2):
-                        self.warnings.append(
-                            f"⚠️ 日期跳跃警告: {file_source} 中出现 {entry_date.strftime('%m/%d')}，"
-                            f"前一条目是{prev_month}月，可能是笔误"
-                        )
-                prev_month = entry_date.month
-
-                current_entry = {'date': entry_date, 'content': []}
-            else:
-                current_entry['content'].append(line.rstrip())
+            # 笔误检测：检查月份跳跃
+            if prev_month is not None and entry_date.month != prev_month:
+                # 允许相邻月份（如1月文件包含到2月初）
+                if abs(entry_date.month - prev_month) > 2 and not (prev_month == 12 and entry_date.month <= 2):
+                    self.warnings.append(
+                        f"⚠️ 日期跳跃警告: {file_source} 中出现 {entry_date.strftime('%m/%d')}，"
+                        f"前一条目是{prev_month}月，可能是笔误"
+                    )
+            prev_month = entry_date.month
 
-        # 保存最后一个条目
-        if current_entry['date'] and current_entry['content']:
-            entries.append(current_entry)
+            spans.append([entry_date, header_end, len(content)])
 
-        # 转换格式，去除尾部空行
         result = []
-        for entry in entries:
-            # 去除尾部空行
-            content_lines = entry['content']
-            while content_lines and content_lines[-1] == '':
-                content_lines.pop()
-            content_text = '\n'.join(content_lines).strip()
+        for entry_date, start, end in spans:
+            content_text = self.clean_entry_body(content[start:end], year)
             if content_text:
                 result.append({
-                    'date': entry['date'],
+                    'date': entry_date,
                     'content': content_text
                 })
 
         return result
 
-    def classify_file(self, file_path, year, content):
+    def classify_file(self, filename, year, headers):
         """
-        智能分类文件类型
+        智能分类文件类型（headers 为 scan_date_headers 的结果）
         返回: 'single_day' | 'multi_day' | 'stock_diary' | 'retrospective' | 'summary' | 'note'
         """
-        filename = file_path.name
-        filename_lower = filename.lower()
-
         # index.md → 早期回忆
         if filename == 'index.md':
             return 'retrospective'
@@ -231,46 +239,48 @@ class DiaryImporter:
             return 'stock_diary'
 
         # 特殊笔记类文件
-        note_keywords = ['线下活动', '漫展', '名单', '感想', '规划', '目标',
-                         '总结', '经验', '简史', '复诊', '帖子', '三角',
-                         '叫魂', 'record']
-        if any(kw in filename for kw in note_keywords):
+        if _RE_NOTE_KW.search(filename):
             return 'note'
 
         # 学期总结类
-        if any(kw in filename_lower for kw in ['semester', 'term', 'vaction']):
+        if _RE_SUMMARY_KW.search(filename):
             return 'summary'
 
         # MM_DD.txt 格式的文件：通过内容中日期标记数量判断
         file_date = self.parse_date_from_filename(filename, year)
         if file_date:
-            date_marker_count = self.count_date_markers(content, year)
-            if date_marker_count >= 2:
+            if len(headers) >= 2:
                 return 'multi_day'
             return 'single_day'
 
         # 无法识别
         return 'note'
 
-    def process_file(self, file_path, year):
-        """处理单个文件"""
+    def process_file(self, file_path, filename, relative_path, year, jan1, dec31):
+        """
+        处理单个文件
+        file_path 为 str 路径，relative_path 形如 '2021/01_01.txt'，
+        year 为 int 年份，jan1/dec31 为该年缓存的兜底日期
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                content = f.read().strip()
+            # 二进制读取后一次性解码，换行统一为 \n（等价于文本模式的通用换行）
+            with open(file_path, 'rb') as f:
+                raw = f.read()
+            content = raw.decode('utf-8', 'ignore').replace('\r\n', '\n').replace('\r', '\n').strip()
 
             if not content:
                 logger.warning(f"文件为空: {file_path}")
                 return []
 
-            filename = file_path.name
-            relative_path = str(file_path.relative_to(self.diary_root))
-            file_type = self.classify_file(file_path, year, content)
+            # 日期标记只扫描一次，分类与拆分共用
+            headers = self.scan_date_headers(content, year)
+            file_type = self.classify_file(filename, year, headers)
 
             entries = []
 
             if file_type == 'retrospective':
                 entries.append({
-                    'date': date(int(year), 1, 1),
+                    'date': jan1,
                     'content': content,
                     'entry_type': 'retrospective',
                     'file_source': relative_path
@@ -287,7 +297,7 @@ class DiaryImporter:
                     })
 
             elif file_type in ('multi_day', 'stock_diary'):
-                multi_entries = self.split_multi_day_content(content, year, relative_path)
+                multi_entries = self.split_multi_day_content(content, year, relative_path, headers)
                 if multi_entries:
                     for entry in multi_entries:
                         entries.append({
@@ -300,7 +310,7 @@ class DiaryImporter:
                     # 拆分失败，作为整体存储
                     fallback_date = self.parse_date_from_filename(filename, year)
                     if not fallback_date:
-                        fallback_date = date(int(year), 1, 1)
+                        fallback_date = jan1
                     entries.append({
                         'date': fallback_date,
                         'content': content,
@@ -311,7 +321,7 @@ class DiaryImporter:
 
             elif file_type == 'summary':
                 entries.append({
-                    'date': date(int(year), 12, 31),
+                    'date': dec31,
                     'content': content,
                     'entry_type': 'summary',
                     'file_source': relative_path
@@ -321,7 +331,7 @@ class DiaryImporter:
                 # 笔记类：尝试从文件名提取月份，否则用1月1日
                 fallback_date = self.parse_date_from_filename(filename, year)
                 if not fallback_date:
-                    fallback_date = date(int(year), 1, 1)
+                    fallback_date = jan1
                 entries.append({
                     'date': fallback_date,
                     'content': content,
@@ -337,68 +347,36 @@ class DiaryImporter:
 
     def collect_entry(self, entry):
         """收集条目，用于后续同日合并"""
-        date_str = entry['date'].strftime('%Y-%m-%d')
-        key = (date_str, entry['entry_type'])
+        # 整数序数作键：排序时比较 int 而非日期字符串，且无需 strftime
+        key = (entry['date'].toordinal(), entry['entry_type'])
 
         if key not in self.all_entries:
-            self.all_entries[key] = entry
+            self.all_entries[key] = {
+                'date': entry['date'],
+                'entry_type': entry['entry_type'],
+                'parts': [entry['content']],
+                'sources': [entry['file_source']],
+            }
         else:
-            # 同日同类型合并
+            # 同日同类型合并：先收集片段，插入前再统一拼接
             existing = self.all_entries[key]
-            existing['content'] += f"\n\n---[同日补充]---\n\n{entry['content']}"
-            existing['file_source'] += f" | {entry['file_source']}"
+            existing['parts'].append(entry['content'])
+            existing['sources'].append(entry['file_source'])
             self.warnings.append(
-                f"📝 同日合并: {date_str} ({entry['entry_type']}) 来自 {entry['file_source']}"
+                f"📝 同日合并: {entry['date']} ({entry['entry_type']}) 来自 {entry['file_source']}"
             )
 
-    def insert_entry(self, entry):
-        """插入单条日记"""
-        try:
-            word_count = self.get_word_count(entry['content'])
-            self.conn.execute("""
-                INSERT OR REPLACE INTO diary_entries
-                (date, year, month, day, content, file_source, entry_type, word_count, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                entry['date'].strftime('%Y-%m-%d'),
-                entry['date'].year,
-                entry['date'].month,
-                entry['date'].day,
-                entry['content'],
-                entry['file_source'],
-                entry['entry_type'],
-                word_count,
-                datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            ))
-            self.conn.execute("""
-                INSERT OR REPLACE INTO diary_fts (date, content, file_source)
-                VALUES (?, ?, ?)
-            """, (
-                entry['date'].strftime('%Y-%m-%d'),
-                entry['content'],
-                entry['file_source']
-            ))
-            return True
-        except Exception as e:
-            logger.error(f"插入数据失败: {e}")
-            return False
-
-    def update_stats(self):
+    def update_stats(self, now_str):
+        """重建年度统计表，now_str 为本次导入的统一时间戳"""
         try:
             self.conn.execute("DELETE FROM diary_stats")
-            cursor = self.conn.execute("""
-                SELECT year, COUNT(*) as total_entries, SUM(word_count) as total_words,
-                       MIN(date) as first_entry, MAX(date) as last_entry
-                FROM diary_entries GROUP BY year ORDER BY year
-            """)
-            for row in cursor:
-                self.conn.execute("""
-                    INSERT INTO diary_stats
-                    (year, total_entries, total_words, first_entry_date, last_entry_date, updated_at)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (row[0], row[1], row[2], row[3], row[4],
-                      datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
-            self.conn.commit()
+            # 聚合与写入在 SQLite 内一条语句完成
+            self.conn.execute("""
+                INSERT INTO diary_stats
+                (year, total_entries, total_words, first_entry_date, last_entry_date, updated_at)
+                SELECT year, COUNT(*), SUM(word_count), MIN(date), MAX(date), ?
+                FROM diary_entries GROUP BY year
+            """, (now_str,))
             logger.info("统计信息更新完成")
         except Exception as e:
             logger.error(f"更新统计失败: {e}")
@@ -410,36 +388,84 @@ class DiaryImporter:
         total_files = 0
 
         try:
-            # 第一遍：收集所有条目
-            for year in self.year_folders:
-                year_path = self.diary_root / year
+            # 第一遍：扫描目录，收集待解析文件
+            jobs = []
+            for year_str, year, jan1, dec31 in self.year_plan:
+                year_path = self.diary_root / year_str
                 if not year_path.is_dir():
                     continue
 
-                logger.info(f"扫描年份: {year}")
+                logger.info(f"扫描年份: {year_str}")
 
-                for file_path in sorted(year_path.iterdir()):
-                    if not file_path.is_file():
+                # scandir 的 DirEntry 自带类型信息，免去逐个 Path.stat/relative_to
+                with os.scandir(year_path) as it:
+                    dir_entries = sorted(it, key=lambda de: de.name)
+
+                for de in dir_entries:
+                    if not de.is_file():
                         continue
-                    if file_path.suffix not in ['.txt', '.md']:
+                    name = de.name
+                    dot = name.rfind('.')
+                    if dot <= 0 or name[dot:] not in _DIARY_SUFFIXES:
                         continue
                     # 排除图片等
-                    if any(ext in file_path.name.lower() for ext in ['.jpg', '.png', '.xlsx', '.rtf']):
+                    if _RE_SKIP_MARKERS.search(name):
                         continue
 
                     total_files += 1
-                    entries = self.process_file(file_path, year)
-                    for entry in entries:
+                    # 空文件直接按 scandir 缓存的大小跳过，不必打开
+                    if de.stat().st_size == 0:
+                        logger.warning(f"文件为空: {de.path}")
+                        continue
+                    jobs.append((de.path, name, f"{year_str}/{name}", year, jan1, dec31))
+
+            # 各文件解析互不依赖且为纯 CPU 工作，交给进程池并行；合并与入库仍在主进程顺序进行
+            workers = min(MAX_PARSE_WORKERS, os.cpu_count() or 1)
+            if workers < 2 or len(jobs) < PARALLEL_MIN_JOBS:
+                # 文件少或单核时进程池只有开销（启动子进程、回传全部正文），直接在主进程解析
+                for job in jobs:
+                    for entry in self.process_file(*job):
                         self.collect_entry(entry)
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                         initargs=(self.diary_root,)) as executor:
+                    for entries, warnings in executor.map(_process_file, jobs, chunksize=32):
+                        self.warnings.extend(warnings)
+                        for entry in entries:
+                            self.collect_entry(entry)
+
+            # 第二遍：批量插入合并后的条目（本次导入共用一个时间戳）
+            now_str = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            rows = []
+            for key in sorted(self.all_entries):
+                entry = self.all_entries[key]
+                entry_date = entry['date']
+                content = MERGE_SEPARATOR.join(entry['parts'])
+                rows.append((
+                    entry_date.strftime('%Y-%m-%d'),
+                    entry_date.year,
+                    entry_date.month,
+                    entry_date.day,
+                    content,
+                    " | ".join(entry['sources']),
+                    entry['entry_type'],
+                    self.get_word_count(content),
+                    now_str
+                ))
+            self.conn.executemany("""
+                INSERT OR REPLACE INTO diary_entries
+                (date, year, month, day, content, file_source, entry_type, word_count, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
+            total_entries = len(rows)
 
-            # 第二遍：插入合并后的条目
-            total_entries = 0
-            for key, entry in sorted(self.all_entries.items()):
-                if self.insert_entry(entry):
-                    total_entries += 1
+            # 全文索引一次性从 diary_entries 建立，比逐行触发器分词快得多；随后恢复插入触发器
+            self.conn.execute("INSERT INTO diary_fts (diary_fts) VALUES ('rebuild')")
+            self.conn.execute(self.fts_insert_trigger)
 
-            self.conn.commit()
-            self.update_stats()
+            self.update_stats(now_str)
+            # connect_db 中开启的事务到此一次性提交
+            self.conn.execute("COMMIT")
 
             logger.info(f"导入完成! 处理 {total_files} 个文件，导入 {total_entries} 条日记")
 
@@ -466,16 +492,26 @@ class DiaryImporter:
 
     def show_stats(self):
         try:
-            cursor = self.conn.execute("""
-                SELECT year, total_entries, total_words, first_entry_date, last_entry_date
-                FROM diary_stats ORDER BY year
-            """)
+            # 年度统计与类型统计合并为一次查询，part 区分两部分（0: 年度，1: 类型）
+            rows = self.conn.execute("""
+                SELECT * FROM (
+                    SELECT 0 AS part, year AS label, total_entries AS entries, total_words,
+                           first_entry_date, last_entry_date
+                    FROM diary_stats
+                    UNION ALL
+                    SELECT 1, entry_type, COUNT(*), SUM(word_count), NULL, NULL
+                    FROM diary_entries GROUP BY entry_type
+                )
+                ORDER BY part, CASE part WHEN 0 THEN label END, entries DESC
+            """).fetchall()
+
             print(f"\n{'年份':<8} {'条目数':<8} {'总字数':<10} {'首篇日期':<12} {'末篇日期':<12}")
             print("-" * 60)
             grand_entries = 0
             grand_words = 0
-            for row in cursor:
-                year, entries, words, first_date, last_date = row
+            for part, year, entries, words, first_date, last_date in rows:
+                if part != 0:
+                    continue
                 grand_entries += entries
                 grand_words += words
                 print(f"{year:<8} {entries:<8} {words:<10} {first_date:<12} {last_date:<12}")
@@ -483,22 +519,34 @@ class DiaryImporter:
             print(f"{'总计':<8} {grand_entries:<8} {grand_words:<10}")
 
             # 按类型统计
-            cursor2 = self.conn.execute("""
-                SELECT entry_type, COUNT(*), SUM(word_count)
-                FROM diary_entries GROUP BY entry_type ORDER BY COUNT(*) DESC
-            """)
             print(f"\n{'类型':<16} {'条目数':<8} {'总字数':<10}")
             print("-" * 40)
-            for row in cursor2:
-                print(f"{row[0]:<16} {row[1]:<8} {row[2]:<10}")
+            for part, entry_type, entries, words, _, _ in rows:
+                if part == 1:
+                    print(f"{entry_type:<16} {entries:<8} {words:<10}")
 
         except Exception as e:
             logger.error(f"显示统计信息失败: {e}")
 
 
+# 子进程内复用的解析器实例，由 _init_worker 创建
+_worker_importer = None
+
+
+def _init_worker(diary_root):
+    """进程池初始化：每个子进程构造一次解析器（预编译的标题正则等随之复用）"""
+    global _worker_importer
+    _worker_importer = DiaryImporter(diary_root, None)
+
+
+def _process_file(job):
+    """在子进程中解析单个文件，返回 (条目列表, 本文件产生的警告)"""
+    _worker_importer.warnings = []
+    entries = _worker_importer.process_file(*job)
+    return entries, _worker_importer.warnings
+
+
 def main():
-    from config import get_config
-    
     try:
         config = get_config()
         diary_root = config['diary_base_path']
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+全文索引重建脚本
+按 create_diary_fts.sql 的当前定义重建 diary_fts 并从 diary_entries 回填
+用于已有数据库迁移（如切换到 trigram 分词），日记与摘要数据保持不变
+"""
+
+import sqlite3
+import sys
+from pathlib import Path
+
+# 确保可导入项目根目录模块（如 config.py）
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from config import get_config
+from db import open_db, ensure_summary_column
+
+# Windows 控制台编码修复
+if sys.platform == 'win32':
+    sys.stdout.reconfigure(encoding='utf-8', errors='replace')
+    sys.stderr.reconfigure(encoding='utf-8', errors='replace')
+
+# 回填语句（外部内容表直接从 diary_entries 重建）
+POPULATE_SQL = """
+INSERT INTO diary_fts (diary_fts) VALUES ('rebuild');
+"""
+
+
+def rebuild_fts(conn):
+    """在单个事务内删除旧索引、按新定义建表并回填"""
+    with open(ROOT_DIR / "create_diary_fts.sql", 'r', encoding='utf-8') as f:
+        fts_sql = f.read()
+    conn.executescript("BEGIN;\n" + fts_sql + POPULATE_SQL + "COMMIT;")
+
+
+def main():
+    if sqlite3.sqlite_version_info < (3, 34, 0):
+        print(f"❌ SQLite 版本过低 ({sqlite3.sqlite_version})，trigram 全文索引需要 3.34+")
+        sys.exit(1)
+
+    try:
+        config = get_config()
+        db_path = config['database_path']
+    except Exception as e:
+        print(f"❌ 配置加载失败: {e}")
+        sys.exit(1)
+
+    if not db_path.exists():
+        print(f"❌ 数据库文件不存在: {db_path}")
+        sys.exit(1)
+
+    conn = open_db(db_path)
+    try:
+        print("🔧 正在重建全文索引...")
+        ensure_summary_column(conn)
+        rebuild_fts(conn)
+        count = conn.execute("SELECT COUNT(*) FROM diary_fts").fetchone()[0]
+        print(f"✅ 重建完成，共索引 {count} 条日记")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,8 +5,9 @@
 仅显示逐年日记字数统计和字数写作趋势
 """
 
-import sqlite3
 import sys
+import argparse
+import matplotlib
 import matplotlib.pyplot as plt
 from pathlib import Path
 
@@ -15,9 +16,25 @@ ROOT_DIR = Path(__file__).resolve().parent.parent
 if str(ROOT_DIR) not in sys.path:
     sys.path.insert(0, str(ROOT_DIR))
 
+from config import get_config
+from db import open_db
+
+# 人生阶段划分：(名称, 起始年, 结束年)
+PERIODS = (
+    ("初中-高中", 2004, 2010),
+    ("大学时期", 2011, 2014),
+    ("工作时期", 2015, 2026),
+)
+
+# 图表默认分辨率；300 dpi 的位图面积是 150 dpi 的 4 倍，需要时用 --dpi 指定
+CHART_DPI = 150
+
+# 非交互后端：只能输出文件，show() 无意义（无图形界面时 matplotlib 会自动退回 agg）
+NON_INTERACTIVE_BACKENDS = frozenset({'agg', 'cairo', 'pdf', 'pgf', 'ps', 'svg', 'template'})
+
 def get_yearly_stats(db_path):
     """获取年度字数统计"""
-    conn = sqlite3.connect(db_path)
+    conn = open_db(db_path)
     
     # 仅查询字数相关字段，排除2026年
     query = """
@@ -26,7 +43,7 @@ def get_yearly_stats(db_path):
         SUM(word_count) as total_words,
         MIN(date) as first_entry,
         MAX(date) as last_entry,
-        ROUND(SUM(word_count) / COUNT(DISTINCT strftime('%j', date)), 1) as avg_words_per_active_day
+        ROUND(SUM(word_count) / COUNT(DISTINCT date), 1) as avg_words_per_active_day
     FROM diary_entries
     WHERE year <= 2025
     GROUP BY year
@@ -58,6 +75,16 @@ def display_yearly_stats(stats):
     
     return stats
 
+def get_period_words(stats):
+    """一次遍历累计各时期总字数，顺序与 PERIODS 一致；没有数据的时期为 None"""
+    totals = [None] * len(PERIODS)
+    for year, words, *_ in stats:
+        for i, (_, start, end) in enumerate(PERIODS):
+            if start <= year <= end:
+                totals[i] = (totals[i] or 0) + words
+                break
+    return totals
+
 def analyze_trends(stats):
     """分析字数写作趋势"""
     print(f"\n{'='*50}")
@@ -74,19 +101,11 @@ def analyze_trends(stats):
     # 分析时期
     print(f"\n📊 不同时期字数产出:")
     
-    periods = [
-        ("初中-高中", 2004, 2010),
-        ("大学时期", 2011, 2014),
-        ("工作时期", 2015, 2026)
-    ]
-    
-    for label, start, end in periods:
-        period_data = [s for s in stats if start <= s[0] <= end]
-        if period_data:
-            period_words = sum(s[1] for s in period_data)
+    for (label, start, end), period_words in zip(PERIODS, get_period_words(stats)):
+        if period_words is not None:
             print(f"   {label} ({start}-{end}): {period_words:,}字")
 
-def create_charts(stats):
+def create_charts(stats, dpi=CHART_DPI):
     """创建字数统计图表"""
     try:
         plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei']
@@ -108,26 +127,29 @@ def create_charts(stats):
         ax1.tick_params(axis='x', rotation=45)
         
         # 2. 时期分布饼图
-        early_words = sum(s[1] for s in stats if 2004 <= s[0] <= 2010)
-        college_words = sum(s[1] for s in stats if 2011 <= s[0] <= 2014)
-        work_words = sum(s[1] for s in stats if 2015 <= s[0] <= 2026)
+        period_words = [w or 0 for w in get_period_words(stats)]
         
-        ax2.pie([early_words, college_words, work_words], 
-                labels=['初中-高中', '大学', '工作'], 
+        ax2.pie(period_words, 
+                labels=[label for label, _, _ in PERIODS], 
                 autopct='%1.1f%%', colors=['#FFB6C1', '#87CEEB', '#98FB98'], startangle=90)
         ax2.set_title('各时期字数贡献占比', fontweight='bold')
         
         plt.tight_layout()
         chart_path = Path(__file__).parent / "yearly_word_stats.png"
-        plt.savefig(chart_path, dpi=300)
+        plt.savefig(chart_path, dpi=dpi)
         print(f"\n📊 字数统计图表已保存到: {chart_path}")
-        plt.show()
+        # 无图形界面（如 SSH、定时任务）时只保存文件，不调用 show()；X11、Wayland、Windows、macOS 均由后端判断
+        if matplotlib.get_backend().lower() not in NON_INTERACTIVE_BACKENDS:
+            plt.show()
+        plt.close(fig)
             
     except Exception as e:
         print(f"\n⚠️ 绘图失败: {e}")
 
 def main():
-    from config import get_config
+    parser = argparse.ArgumentParser(description='年度写作统计')
+    parser.add_argument('--dpi', type=int, default=CHART_DPI, help=f'图表分辨率（默认 {CHART_DPI}）')
+    args = parser.parse_args()
     
     try:
         config = get_config()
@@ -147,7 +169,7 @@ def main():
     
     display_yearly_stats(stats)
     analyze_trends(stats)
-    create_charts(stats)
+    create_charts(stats, dpi=args.dpi)
     print(f"\n✅ 分析完成！")
 
 if __name__ == "__main__":
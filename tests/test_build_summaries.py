@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+摘要生成脚本的单元测试
+覆盖缓存键（含模型）、--no-cache、批量写回的事务与全文索引同步
+"""
+
+import contextlib
+import io
+import sqlite3
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+# 确保可导入项目根目录模块（如 config.py）
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from scripts import build_summaries as bs
+
+LONG_CONTENT = "今天和朋友去三亚度假，海边的风很大，晚上吃了海鲜。"
+
+
+def create_db(path=':memory:'):
+    """按仓库 schema 建库（含 diary_fts 与触发器、llm_cache），autocommit 模式"""
+    conn = sqlite3.connect(path, isolation_level=None)
+    for name in ('create_diary_db.sql', 'create_diary_fts.sql'):
+        conn.executescript((ROOT_DIR / name).read_text(encoding='utf-8'))
+    bs.ensure_llm_cache(conn)
+    return conn
+
+
+def add_entry(conn, content=LONG_CONTENT, day=1):
+    """插入一条 2021-01-<day> 的日记，返回 id"""
+    cursor = conn.execute(
+        "INSERT INTO diary_entries (date, year, month, day, content, entry_type, word_count) "
+        "VALUES (?, 2021, 1, ?, ?, 'single_day', ?)",
+        (f"2021-01-{day:02d}", day, content, len(content))
+    )
+    return cursor.lastrowid
+
+
+def entry_row(conn, entry_id):
+    """按 get_all_entries_without_summary 的列顺序取一行"""
+    return conn.execute(
+        "SELECT id, date, content, entry_type, word_count FROM diary_entries WHERE id = ?",
+        (entry_id,)
+    ).fetchone()
+
+
+class TestCacheKey(unittest.TestCase):
+    """缓存键必须区分模型；模型未知时不缓存"""
+
+    def params(self, model):
+        with mock.patch.object(bs, 'get_llm_model', return_value=model):
+            return bs.build_llm_params("同一个 prompt")
+
+    def test_model_sent_and_part_of_key(self):
+        params_a, params_b = self.params('model-a'), self.params('model-b')
+        self.assertEqual(params_a['model'], 'model-a')
+        self.assertIsNotNone(bs.llm_cache_key(params_a))
+        self.assertNotEqual(bs.llm_cache_key(params_a), bs.llm_cache_key(params_b))
+        self.assertEqual(bs.llm_cache_key(params_a), bs.llm_cache_key(self.params('model-a')))
+
+    def test_no_model_no_key(self):
+        params = self.params(None)
+        self.assertNotIn('model', params)
+        self.assertIsNone(bs.llm_cache_key(params))
+
+
+class TestPrepareSummary(unittest.TestCase):
+    """缓存命中、--no-cache 绕过与覆盖写入"""
+
+    def setUp(self):
+        self.conn = create_db()
+        self.entry = entry_row(self.conn, add_entry(self.conn))
+        patcher = mock.patch.object(bs, 'get_llm_model', return_value='model-a')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def cached(self, key):
+        return bs.get_cached_response(self.conn, key)
+
+    def test_short_entry_uses_content(self):
+        entry = entry_row(self.conn, add_entry(self.conn, content="  上班  ", day=2))
+        self.assertEqual(bs.prepare_summary(self.conn, entry), ("上班", None, None))
+
+    def test_cache_hit_then_no_cache_bypass_and_overwrite(self):
+        summary, key, params = bs.prepare_summary(self.conn, self.entry)
+        self.assertIsNone(summary)
+        self.assertIsNotNone(key)
+        bs.flush_summaries(self.conn, [("旧摘要", self.entry[0])], [(key, "旧摘要", int(time.time()))])
+
+        # 默认读取缓存
+        self.assertEqual(bs.prepare_summary(self.conn, self.entry), ("旧摘要", None, None))
+
+        # --no-cache：不读缓存，仍返回 key 以便覆盖写入
+        summary, key2, params2 = bs.prepare_summary(self.conn, self.entry, use_cache=False)
+        self.assertIsNone(summary)
+        self.assertEqual((key2, params2), (key, params))
+        bs.flush_summaries(self.conn, [("新摘要", self.entry[0])], [(key2, "新摘要", int(time.time()))])
+        self.assertEqual(self.cached(key), "新摘要")
+
+    def test_model_change_misses_cache(self):
+        _, key, _ = bs.prepare_summary(self.conn, self.entry)
+        bs.flush_summaries(self.conn, [("旧摘要", self.entry[0])], [(key, "旧摘要", int(time.time()))])
+        with mock.patch.object(bs, 'get_llm_model', return_value='model-b'):
+            summary, key_b, _ = bs.prepare_summary(self.conn, self.entry)
+        self.assertIsNone(summary)
+        self.assertNotEqual(key_b, key)
+
+    def test_unknown_model_skips_cache(self):
+        with mock.patch.object(bs, 'get_llm_model', return_value=None):
+            summary, key, params = bs.prepare_summary(self.conn, self.entry)
+        self.assertIsNone(summary)
+        self.assertIsNone(key)
+        self.assertIsNotNone(params)
+
+
+class TestFlushSummaries(unittest.TestCase):
+    """摘要与缓存在同一事务内写回，并经触发器同步到 diary_fts"""
+
+    def setUp(self):
+        self.conn = create_db()
+        self.entry_id = add_entry(self.conn)
+
+    def tearDown(self):
+        self.conn.close()
+
+    def test_summary_searchable_after_flush(self):
+        bs.flush_summaries(self.conn, [("海南三亚度假", self.entry_id)])
+        self.assertEqual(
+            self.conn.execute(
+                "SELECT rowid FROM diary_fts WHERE diary_fts MATCH 'summary : 三亚度假'"
+            ).fetchall(),
+            [(self.entry_id,)]
+        )
+
+    def test_rollback_both_tables_on_error(self):
+        # UPDATE 阶段失败：此前写入的 llm_cache 行也必须回滚
+        self.conn.execute("""
+            CREATE TRIGGER fail_update BEFORE UPDATE OF summary ON diary_entries
+            WHEN new.summary = 'boom' BEGIN SELECT RAISE(ABORT, 'boom'); END
+        """)
+        batch = [("boom", self.entry_id)]
+        cache_rows = [("k1", "boom", int(time.time()))]
+        with self.assertRaises(sqlite3.IntegrityError):
+            bs.flush_summaries(self.conn, batch, cache_rows)
+
+        self.assertFalse(self.conn.in_transaction)
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone(), (0,))
+        self.assertEqual(
+            self.conn.execute("SELECT summary FROM diary_entries WHERE id = ?", (self.entry_id,)).fetchone(),
+            (None,)
+        )
+        # 失败时保留待写内容，不清空
+        self.assertEqual((len(batch), len(cache_rows)), (1, 1))
+
+    def test_lists_cleared_after_commit(self):
+        batch = [("摘要", self.entry_id)]
+        cache_rows = [("k1", "摘要", int(time.time()))]
+        bs.flush_summaries(self.conn, batch, cache_rows)
+        self.assertEqual((batch, cache_rows), ([], []))
+        self.assertEqual(self.conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone(), (1,))
+
+
+class TestRunFullBuild(unittest.TestCase):
+    """全量模式：并发请求、写回与再次运行时命中缓存"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = Path(self.tmp.name) / 'diary.db'
+        conn = create_db(self.db_path)
+        for day in range(1, 8):
+            add_entry(conn, content=f"第{day}天：" + LONG_CONTENT, day=day)
+        add_entry(conn, content="上班", day=8)
+        conn.close()
+
+        config = {'database_path': self.db_path, 'lm_studio_url': 'http://127.0.0.1:1/v1/chat/completions'}
+        for patcher in (
+            mock.patch.object(bs, 'get_config_value', side_effect=config.__getitem__),
+            mock.patch.object(bs, 'get_llm_model', return_value='model-a'),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_build(self, use_cache=True):
+        calls = []
+
+        def fake_request(params):
+            calls.append(params)
+            return "摘要：" + params['messages'][0]['content'][-20:], None
+
+        with mock.patch.object(bs, 'request_llm', side_effect=fake_request), \
+                contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(bs.run_full_build(use_cache))
+        return len(calls)
+
+    def summaries(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            return conn.execute("SELECT summary FROM diary_entries ORDER BY id").fetchall()
+        finally:
+            conn.close()
+
+    def test_build_then_cached_rerun(self):
+        # 连接测试 1 次 + 7 条长日记；极短日记直接用原文
+        self.assertEqual(self.run_build(), 8)
+        first = self.summaries()
+        self.assertTrue(all(row[0] for row in first))
+        self.assertEqual(first[-1], ("上班",))
+
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE diary_entries SET summary = NULL")
+        conn.commit()
+        conn.close()
+
+        # 再次运行全部命中缓存，只剩连接测试
+        self.assertEqual(self.run_build(), 1)
+        self.assertEqual(self.summaries(), first)
+
+        # --no-cache 重新请求全部长日记
+        conn = sqlite3.connect(self.db_path)
+        conn.execute("UPDATE diary_entries SET summary = NULL")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.run_build(use_cache=False), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
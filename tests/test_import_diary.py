@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+导入脚本解析逻辑的单元测试
+覆盖日期标记格式、越界标记、标题行、CRLF、全角/制表符缩进与同日合并
+"""
+
+import contextlib
+import io
+import logging
+import sqlite3
+import sys
+import tempfile
+import unittest
+from datetime import date
+from pathlib import Path
+
+# 确保可导入项目根目录模块（如 config.py）
+ROOT_DIR = Path(__file__).resolve().parent.parent
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
+from scripts.import_diary_to_db import DiaryImporter, MERGE_SEPARATOR
+
+YEAR = 2021
+
+
+def split(content):
+    """用 2021 年解析多日内容，返回 [(日期, 正文)]"""
+    importer = DiaryImporter('.', None)
+    return [(e['date'], e['content']) for e in importer.split_multi_day_content(content, YEAR)]
+
+
+class TestDateHeaders(unittest.TestCase):
+    """内容中的日期标记"""
+
+    def test_each_header_format(self):
+        for first, second in (('0101', '0102'), ('1_1', '1_2'),
+                              ('1月1日', '1月2日'), ('01/01', '01/02')):
+            with self.subTest(header=first):
+                self.assertEqual(
+                    split(f"{first}\n第一天\n{second}\n第二天"),
+                    [(date(YEAR, 1, 1), '第一天'), (date(YEAR, 1, 2), '第二天')]
+                )
+
+    def test_out_of_range_headers_stay_in_body(self):
+        # 13 月与 2 月 30 日都不是有效日期，按普通正文保留
+        self.assertEqual(
+            split("0101\n甲\n1345\n乙\n0230\n丙"),
+            [(date(YEAR, 1, 1), '甲\n1345\n乙\n0230\n丙')]
+        )
+
+    def test_header_must_be_whole_line(self):
+        self.assertEqual(
+            split("0101\n花了 0102 元\n1月2日去了公园"),
+            [(date(YEAR, 1, 1), '花了 0102 元\n1月2日去了公园')]
+        )
+
+    def test_full_width_and_tab_padding(self):
+        self.assertEqual(
+            split("　0101\t\n甲\n\t1月2日　\n乙"),
+            [(date(YEAR, 1, 1), '甲'), (date(YEAR, 1, 2), '乙')]
+        )
+
+    def test_title_lines_removed(self):
+        self.assertEqual(
+            split("0101\n甲\n  2021 生活日记  \n乙\n2021炒股日记\n0102\n2021 日记\n丙"),
+            [(date(YEAR, 1, 1), '甲\n乙'), (date(YEAR, 1, 2), '丙')]
+        )
+
+    def test_other_year_title_kept(self):
+        self.assertEqual(split("0101\n2020 日记\n甲"), [(date(YEAR, 1, 1), '2020 日记\n甲')])
+
+    def test_trailing_whitespace_and_blank_edges_stripped(self):
+        self.assertEqual(split("0101\n\n甲  \n  乙\t\n\n"), [(date(YEAR, 1, 1), '甲\n  乙')])
+
+
+class TestProcessFile(unittest.TestCase):
+    """单个文件的读取、分类与拆分"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.importer = DiaryImporter(self.tmp.name, None)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def process(self, filename, raw):
+        path = Path(self.tmp.name) / filename
+        path.write_bytes(raw)
+        return self.importer.process_file(str(path), filename, f"{YEAR}/{filename}",
+                                          YEAR, date(YEAR, 1, 1), date(YEAR, 12, 31))
+
+    def test_crlf_multi_day(self):
+        entries = self.process('01_01.txt', "0101\r\n甲\r\n0102\r\n乙\r\n".encode('utf-8'))
+        self.assertEqual(
+            [(e['date'], e['content'], e['entry_type']) for e in entries],
+            [(date(YEAR, 1, 1), '甲', 'multi_day'), (date(YEAR, 1, 2), '乙', 'multi_day')]
+        )
+
+    def test_single_day_keeps_whole_content(self):
+        entries = self.process('03_05.txt', "0305\r\n今天很开心\r\n".encode('utf-8'))
+        self.assertEqual(
+            [(e['date'], e['content'], e['entry_type']) for e in entries],
+            [(date(YEAR, 3, 5), '0305\n今天很开心', 'single_day')]
+        )
+
+
+class TestRunImport(unittest.TestCase):
+    """完整导入：同日合并与全文索引"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = Path(self.tmp.name)
+        year_dir = root / str(YEAR)
+        year_dir.mkdir()
+        (year_dir / '01_01.txt').write_text("早上去了公园散步", encoding='utf-8')
+        (year_dir / '01_01_补充.txt').write_text("晚上和朋友吃饭", encoding='utf-8')
+        (year_dir / '01_02.txt.jpg.txt').write_text("不应导入", encoding='utf-8')
+        self.db_path = root / 'diary.db'
+        self.importer = DiaryImporter(root, self.db_path)
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+        self.tmp.cleanup()
+
+    def test_same_day_merge(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(self.importer.run_import())
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT date, content, file_source, entry_type, word_count FROM diary_entries"
+            ).fetchall()
+            self.assertEqual(rows, [(
+                '2021-01-01',
+                "早上去了公园散步" + MERGE_SEPARATOR + "晚上和朋友吃饭",
+                '2021/01_01.txt | 2021/01_01_补充.txt',
+                'single_day',
+                len("早上去了公园散步" + MERGE_SEPARATOR.replace('\n', '') + "晚上和朋友吃饭"),
+            )])
+            # 全文索引在导入结束时一次性重建，插入触发器随后恢复
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM diary_fts WHERE diary_fts MATCH '和朋友'").fetchone(),
+                (1,)
+            )
+            triggers = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+            self.assertIn('diary_entries_ai', triggers)
+        finally:
+            conn.close()
+
+        self.assertTrue(any('同日合并' in w for w in self.importer.warnings))
+
+    def test_two_char_term_search(self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertTrue(self.importer.run_import())
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # trigram 对不足 3 字的词不返回结果，两字词按 README 查 diary_entries 原表
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM diary_fts WHERE content LIKE '%朋友%'").fetchone(),
+                (0,)
+            )
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM diary_entries WHERE content LIKE '%朋友%'").fetchone(),
+                (1,)
+            )
+            self.assertEqual(
+                conn.execute("SELECT COUNT(*) FROM diary_entries WHERE instr(content, ?) > 0",
+                             ('公园',)).fetchone(),
+                (1,)
+            )
+        finally:
+            conn.close()
+
+
+if __name__ == '__main__':
+    unittest.main()